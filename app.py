@@ -1,55 +1,48 @@
-import streamlit as st
+from startup import script_started, script_finished, timed_import, render_report as render_startup_report
+
+first_run = script_started()  # None after the process's first script run
+st = timed_import("streamlit")
 import time
-import plotly.graph_objects as go
+
+import engine
+from eventlog import new_event_log, log_event, render as render_event_log
+from engine import B1_CAPACITY, B2_CAPACITY, STORAGE_THRESHOLD, MAX_TOTAL_BLOCKS, BIG_LIFT_COST
 
 st.set_page_config(page_title="Gravity Battery - Seesaw Simulation", layout="wide")
 
 # ---------- CONFIG ----------
 FRAME_DELAY = 0.08   # seconds per animation frame (lower = faster)
-GRAVITY = 9.81      # m/s²
-HEIGHT = 100        # m (from +50m to -50m)
-B1_CAPACITY = 100_000  # Joules (100 kJ for Battery 1)
-B2_CAPACITY = 1_000_000  # Joules (1 MJ for Battery 2)
-STORAGE_THRESHOLD = 80  # kg to trigger big cycle
-MAX_TOTAL_BLOCKS = 20  # Max blocks (200kg) at A and B combined
+SCENE_KEYS = tuple(key for key in engine.STATE_KEYS if key != "step_count")  # fields draw_scene() shows
 
 # ---------- SESSION STATE ----------
-if "blocks_top_A" not in st.session_state:
-    st.session_state.blocks_top_A = 1  # initial 10 kg = 1 block
-if "blocks_top_B" not in st.session_state:
-    st.session_state.blocks_top_B = 2  # initial 20 kg = 2 blocks
-if "tied_bottom_C" not in st.session_state:
-    st.session_state.tied_bottom_C = 0
-if "tied_bottom_D" not in st.session_state:
-    st.session_state.tied_bottom_D = 0
-if "storage_left" not in st.session_state:
-    st.session_state.storage_left = 0
-if "storage_right" not in st.session_state:
-    st.session_state.storage_right = 0
-if "battery1" not in st.session_state:
-    st.session_state.battery1 = 0  # small battery % (0-100)
-if "battery2" not in st.session_state:
-    st.session_state.battery2 = 0  # big battery % (0-100)
-if "generator_angle" not in st.session_state:
-    st.session_state.generator_angle = 0
-if "houses_lit" not in st.session_state:
-    st.session_state.houses_lit = False
+engine.init_state(st.session_state)
 if "running" not in st.session_state:
     st.session_state.running = False
 if "stop_requested" not in st.session_state:
     st.session_state.stop_requested = False
 if "logs" not in st.session_state:
-    st.session_state.logs = []
-if "step_count" not in st.session_state:
-    st.session_state.step_count = 0
+    st.session_state.logs = new_event_log()
+if "show_scene" not in st.session_state:
+    st.session_state.show_scene = True
+if "stalled" not in st.session_state:
+    st.session_state.stalled = False
+if "audit" not in st.session_state:
+    st.session_state.audit = False
+if "audit_ledger" not in st.session_state:
+    st.session_state.audit_ledger = None
 
 # ---------- DRAW / ANIMATION HELPERS ----------
+def add_log(kind, text, step=None):
+    """Record an event of type `kind` (see eventlog.EVENT_TYPES) at `step`, by default the current one."""
+    log_event(st.session_state.logs, kind, st.session_state.step_count if step is None else step, text)
+
 def draw_scene(dropping=None, drop_y=None, dropping_size=10, note=""):
     """
     dropping: None or tuple(point_name e.g. 'left'/'right'/'BIG', color)
     drop_y: y coordinate of top of the falling rectangle
     dropping_size: kg size for annotation (20 or 160)
     """
+    go = timed_import("plotly.graph_objects")  # reported as preloaded when Streamlit already imported it
     fig = go.Figure()
     # Ground line
     fig.add_shape(type="line", x0=-3, y0=0, x1=3, y1=0, line=dict(color="black", width=3))
@@ -122,15 +115,27 @@ def draw_scene(dropping=None, drop_y=None, dropping_size=10, note=""):
     fig.update_layout(height=600, margin=dict(l=10, r=10, t=10, b=10), autosize=True)
     return fig
 
+def render_scene(placeholder):
+    """Show the resting scene, rebuilding the figure only when the state has changed."""
+    if not st.session_state.show_scene:
+        placeholder.empty()
+        return
+    key = engine.snapshot(st.session_state, SCENE_KEYS)
+    if st.session_state.get("scene_key") != key:
+        st.session_state.scene_fig = draw_scene()
+        st.session_state.scene_key = key
+    placeholder.plotly_chart(st.session_state.scene_fig, use_container_width=True)
+
 def animate_fall(placeholder, pt, color="#2b6cb0", start_y=50, end_y=-50, steps=50, size_kg=20):
     for step in range(steps):
         if st.session_state.stop_requested:
             return False
         t = step / (steps - 1)
         y = start_y + (end_y - start_y) * t
-        fig = draw_scene(dropping=(pt, color), drop_y=y, dropping_size=size_kg)
-        placeholder.plotly_chart(fig, use_container_width=True)
-        time.sleep(FRAME_DELAY)
+        if st.session_state.show_scene:
+            fig = draw_scene(dropping=(pt, color), drop_y=y, dropping_size=size_kg)
+            placeholder.plotly_chart(fig, use_container_width=True)
+            time.sleep(FRAME_DELAY)
     return True
 
 # ---------- MAIN UI ----------
@@ -143,30 +148,40 @@ with left_col:
     if st.button("Start"):
         st.session_state.running = True
         st.session_state.stop_requested = False
-        st.session_state.logs = []
+        st.session_state.logs = new_event_log()
         st.session_state.step_count = 0
+        st.session_state.stalled = False
+        st.session_state.audit_ledger = None
     if st.button("Stop"):
         st.session_state.stop_requested = True
         st.session_state.running = False
+        add_log("stop", "Simulation stopped.")
 
     st.write("Initial top stacks (editable, max 200kg total):")
     blocks_a = st.number_input("Blocks at top A (10kg each)", min_value=0, max_value=MAX_TOTAL_BLOCKS, value=st.session_state.blocks_top_A, step=1)
     blocks_b = st.number_input("Blocks at top B (10kg each)", min_value=0, max_value=MAX_TOTAL_BLOCKS, value=st.session_state.blocks_top_B, step=1)
     if blocks_a + blocks_b <= MAX_TOTAL_BLOCKS:
+        if st.session_state.audit_ledger is not None:
+            # Editing the stacks is not a step: move the audit's expected mass with it
+            st.session_state.audit_ledger["mass"] += (blocks_a + blocks_b - st.session_state.blocks_top_A - st.session_state.blocks_top_B) * 10
         st.session_state.blocks_top_A = blocks_a
         st.session_state.blocks_top_B = blocks_b
     else:
         st.error(f"Total blocks (A + B) must not exceed {MAX_TOTAL_BLOCKS} (200kg).")
+    st.checkbox("Show scene", key="show_scene")
+    st.checkbox("Audit conservation", key="audit", help="Check mass, energy and bounds after every drop")
+    if not st.session_state.audit:
+        st.session_state.audit_ledger = None
+    elif st.session_state.audit_ledger is None:
+        st.session_state.audit_ledger = engine.new_ledger(st.session_state)
 
 with mid_col:
     scene_ph = st.empty()
 
 with right_col:
     st.subheader("Status")
-    total_storage = st.session_state.storage_left + st.session_state.storage_right
-    total_mass = (st.session_state.blocks_top_A + st.session_state.blocks_top_B +
-                  st.session_state.tied_bottom_C + st.session_state.tied_bottom_D +
-                  st.session_state.storage_left // 10 + st.session_state.storage_right // 10) * 10
+    total_storage = engine.storage_total(st.session_state)
+    total_mass = engine.total_mass(st.session_state)
     st.write(f"Step: {st.session_state.step_count}")
     st.write(f"Top A: {st.session_state.blocks_top_A * 10} kg")
     st.write(f"Top B: {st.session_state.blocks_top_B * 10} kg")
@@ -183,130 +198,89 @@ with right_col:
         st.success("Houses are lit by B1!")
     else:
         st.info("Houses are not lit yet")
+    ledger = st.session_state.audit_ledger
+    if ledger is not None:
+        st.write(f"Audit: {ledger['drops']} drops checked, {ledger['violations']} violations")
 
 # Render scene
-scene_ph.plotly_chart(draw_scene(), use_container_width=True)
+render_scene(scene_ph)
 
 # ---------- SIMULATION STEP ----------
 if st.session_state.running and not st.session_state.stop_requested:
-    dropped = False
-    side = None
-    opposite = None
-    color = None
-    lifted = 0
-
     # Log state
-    total_storage = st.session_state.storage_left + st.session_state.storage_right
+    total_storage = engine.storage_total(st.session_state)
+    state_step = st.session_state.step_count  # the snapshot is the state at the end of this step
     st.session_state.step_count += 1
     state_log = (
-        f"--- Step {st.session_state.step_count - 1} ---\n"
+        f"--- Step {state_step} ---\n"
         f"Top A: {st.session_state.blocks_top_A * 10}kg | Top B: {st.session_state.blocks_top_B * 10}kg\n"
         f"Tied C: {st.session_state.tied_bottom_C * 10}kg | Tied D: {st.session_state.tied_bottom_D * 10}kg\n"
         f"Storage L: {st.session_state.storage_left}kg | Storage R: {st.session_state.storage_right}kg | Total: {total_storage}kg\n"
         f"B1: {st.session_state.battery1}% | B2: {st.session_state.battery2}% | Gen: {st.session_state.generator_angle}°\n"
         f"Houses: {'lit' if st.session_state.houses_lit else 'dark'}"
     )
-    st.session_state.logs.append(state_log)
-    st.session_state.logs = st.session_state.logs[-100:]  # Limit to last 100 entries
 
     # Check for drops
-    if st.session_state.blocks_top_A == 2 and st.session_state.blocks_top_B < 2:
-        ok = animate_fall(scene_ph, "left", color="#2b6cb0", steps=50, size_kg=20)
-        if not ok:
-            st.session_state.stop_requested = True
-        st.session_state.blocks_top_A = 0
-        st.session_state.storage_left += 10
-        st.session_state.tied_bottom_C += 1
-        lifted = st.session_state.tied_bottom_D
-        st.session_state.blocks_top_B += lifted
-        st.session_state.tied_bottom_D = 0
-        side, opposite, color = "left", "right", "#2b6cb0"
-        dropped = True
-    elif st.session_state.blocks_top_B == 2 and st.session_state.blocks_top_A < 2:
-        ok = animate_fall(scene_ph, "right", color="#c53030", steps=50, size_kg=20)
-        if not ok:
-            st.session_state.stop_requested = True
-        st.session_state.blocks_top_B = 0
-        st.session_state.storage_right += 10
-        st.session_state.tied_bottom_D += 1
-        lifted = st.session_state.tied_bottom_C
-        st.session_state.blocks_top_A += lifted
-        st.session_state.tied_bottom_C = 0
-        side, opposite, color = "right", "left", "#c53030"
-        dropped = True
-    elif st.session_state.blocks_top_A == 2 and st.session_state.blocks_top_B == 2:
-        # Alternate drops when both sides have 2 blocks
-        if st.session_state.step_count % 2 == 0:
-            ok = animate_fall(scene_ph, "left", color="#2b6cb0", steps=50, size_kg=20)
-            if not ok:
-                st.session_state.stop_requested = True
-            st.session_state.blocks_top_A = 0
-            st.session_state.storage_left += 10
-            st.session_state.tied_bottom_C += 1
-            lifted = st.session_state.tied_bottom_D
-            st.session_state.blocks_top_B += lifted
-            st.session_state.tied_bottom_D = 0
-            side, opposite, color = "left", "right", "#2b6cb0"
-        else:
-            ok = animate_fall(scene_ph, "right", color="#c53030", steps=50, size_kg=20)
-            if not ok:
-                st.session_state.stop_requested = True
-            st.session_state.blocks_top_B = 0
-            st.session_state.storage_right += 10
-            st.session_state.tied_bottom_D += 1
-            lifted = st.session_state.tied_bottom_C
-            st.session_state.blocks_top_A += lifted
-            st.session_state.tied_bottom_C = 0
-            side, opposite, color = "right", "left", "#c53030"
-        dropped = True
-
-    if not dropped:
+    side = engine.choose_drop(st.session_state)
+    if side is None:
+        # Log the stall once; later polls only sleep and rerun to check again
+        if not st.session_state.stalled:
+            add_log("state", state_log, step=state_step)
+            add_log("info", "No drop condition met, checking again (further checks not logged)...")
+            st.session_state.stalled = True
         time.sleep(0.2)
         st.rerun()
-        # If no drop, short sleep and rerun to check again
+    st.session_state.stalled = False
+    add_log("state", state_log, step=state_step)
+
+    color = "#2b6cb0" if side == "left" else "#c53030"
+    ok = animate_fall(scene_ph, side, color=color, steps=50, size_kg=20)
+    if not ok:
+        st.session_state.stop_requested = True
+    ledger = st.session_state.audit_ledger
+    before = engine.audit_begin(st.session_state) if ledger is not None else None
+    lifted = engine.apply_drop(st.session_state, side)
 
     # Generate power for small drop (20kg)
-    energy_joules = 20 * GRAVITY * HEIGHT  # 19,620 J
-    st.session_state.battery1 = min(st.session_state.battery1 + (energy_joules / B1_CAPACITY) * 100, 100)
-    st.session_state.generator_angle += (energy_joules / B1_CAPACITY) * 360  # Proportional rotation
-    st.session_state.houses_lit = st.session_state.battery1 >= 10
+    energy_joules = engine.SMALL_DROP_ENERGY
+    engine.charge_small_drop(st.session_state)
 
     # Log drop event
-    lift_to = "B" if opposite == "right" else "A"
+    lift_to = "A" if side == "right" else "B"
     drop_to = "C" if side == "left" else "D"
-    st.session_state.logs.append(
+    add_log("drop",
         f"Action: Dropped 20kg from {side.upper()} to {drop_to}, stored 10kg, tied 10kg. "
         f"Lifted {lifted * 10}kg to {lift_to}. B1 +{(energy_joules / B1_CAPACITY) * 100:.1f}%, Generator +{(energy_joules / B1_CAPACITY) * 360:.0f}°."
     )
     # Add 10kg to opposite side
-    if opposite == "left":
-        st.session_state.blocks_top_A += 1
-        add_side = "A"
-    else:
-        st.session_state.blocks_top_B += 1
-        add_side = "B"
-    st.session_state.logs.append(f"Action: Added 10kg to {add_side}.")
-    st.session_state.logs = st.session_state.logs[-100:]
+    add_side = engine.add_to_opposite(st.session_state, side)
+    add_log("drop", f"Action: Added 10kg to {add_side}.")
+    # Audit before the next st.* call: a widget change stops the script there
+    if ledger is not None:
+        violation = engine.audit_drop(st.session_state, ledger, before)
+        if violation is not None:
+            add_log("error", f"Audit: {violation}")
 
     # Update scene after drop
-    scene_ph.plotly_chart(draw_scene(), use_container_width=True)
+    render_scene(scene_ph)
     time.sleep(0.4)
 
     # Check for STORAGE threshold -> trigger BIG CYCLE
-    total_storage = st.session_state.storage_left + st.session_state.storage_right
+    total_storage = engine.storage_total(st.session_state)
     if total_storage >= STORAGE_THRESHOLD:
-        st.session_state.logs.append(f"Action: Big cycle triggered (Storage = {total_storage}kg). Dropping 160kg...")
+        add_log("big_cycle", f"Action: Big cycle triggered (Storage = {total_storage}kg). Dropping 160kg...")
         ok = animate_fall(scene_ph, "BIG", color="#805ad5", steps=60, size_kg=160)
         if not ok:
             st.session_state.stop_requested = True
-        energy_joules = 160 * GRAVITY * HEIGHT  # 156,960 J
-        st.session_state.generator_angle += (energy_joules / B2_CAPACITY) * 360
-        st.session_state.battery2 = min(st.session_state.battery2 + (energy_joules / B2_CAPACITY) * 100, 100)
-        st.session_state.storage_left = 0
-        st.session_state.storage_right = 0
-        st.session_state.battery2 = max(st.session_state.battery2 - (80_000 / B2_CAPACITY) * 100, 0)  # Assume 80 kJ to lift
-        total_storage = st.session_state.storage_left + st.session_state.storage_right
-        st.session_state.logs.append(
+        energy_joules = engine.BIG_DROP_ENERGY
+        before = engine.audit_begin(st.session_state) if ledger is not None else None
+        big = engine.big_cycle(st.session_state, engine.RULES_RESET)
+        if ledger is not None:
+            violation = engine.audit_big_cycle(st.session_state, engine.RULES_RESET, ledger, before, big)
+            if violation is not None:
+                add_log("error", f"Audit: {violation}")
+        total_storage = engine.storage_total(st.session_state)
+        add_log("big_cycle",
             f"--- Step {st.session_state.step_count} ---\n"
             f"Top A: {st.session_state.blocks_top_A * 10}kg | Top B: {st.session_state.blocks_top_B * 10}kg\n"
             f"Tied C: {st.session_state.tied_bottom_C * 10}kg | Tied D: {st.session_state.tied_bottom_D * 10}kg\n"
@@ -314,11 +288,9 @@ if st.session_state.running and not st.session_state.stop_requested:
             f"B1: {st.session_state.battery1}% | B2: {st.session_state.battery2}% | Gen: {st.session_state.generator_angle}°\n"
             f"Houses: {'lit' if st.session_state.houses_lit else 'dark'}\n"
             f"Action: Big cycle: Dropped 160kg, B2 +{(energy_joules / B2_CAPACITY) * 100:.1f}%, "
-            f"Gen +{(energy_joules / B2_CAPACITY) * 360:.0f}°. Reset storages. Used {(80_000 / B2_CAPACITY) * 100:.1f}% B2 to lift 160kg."
+            f"Gen +{(energy_joules / B2_CAPACITY) * 360:.0f}°. Reset storages. Used {(BIG_LIFT_COST / B2_CAPACITY) * 100:.1f}% B2 to lift 160kg."
         )
-        st.session_state.logs = st.session_state.logs[-100:]
-        st.session_state.houses_lit = st.session_state.battery1 >= 10
-        scene_ph.plotly_chart(draw_scene(), use_container_width=True)
+        render_scene(scene_ph)
         time.sleep(0.6)
 
     # Rerun to update UI with new values
@@ -326,4 +298,8 @@ if st.session_state.running and not st.session_state.stop_requested:
 
 # Event Log display
 st.subheader("Simulation Steps & Events")
-st.text_area("Simulation Log", value="\n".join(st.session_state.logs), height=300, disabled=True)
+render_event_log(st.session_state.logs)
+
+script_finished(first_run)
+with st.expander("Startup times"):
+    render_startup_report()
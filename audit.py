@@ -0,0 +1,171 @@
+"""Conservation and invariant fuzzer for the step engine.
+
+The audit itself lives in the engine: `engine.step(state, rules, ledger)`
+keeps a running ledger (see `engine.new_ledger`) and checks, after every
+drop:
+
+- mass: total mass only changes by the 10kg added per drop and, under the
+  reset rules, by the storage emptied in a big cycle;
+- energy: each battery's change equals what the drop produced minus the
+  80 kJ lift cost, with any difference only allowed as overflow at 100%;
+- bounds: both batteries stay within 0-100% and no block count goes negative.
+
+The apps expose the same ledger behind their 'Audit conservation' toggle.
+This module fuzzes states the apps can reach and replays the first
+violation it finds as a readable trace:
+
+    python audit.py --rules return --seconds 60 --workers 4
+"""
+import argparse
+import multiprocessing
+import random
+import time
+
+from engine import (B1_CAPACITY, B2_CAPACITY, BIG_DROP_ENERGY, BIG_LIFT_COST, RULES, RULES_RESET,
+                    SMALL_DROP_ENERGY, app_start, new_ledger, step, total_mass)
+
+MAX_WALK = 200  # engine steps taken from an app start before auditing begins
+
+
+def ledger_totals(ledger):
+    """Expand `ledger` into kg and Joule totals."""
+    lift_unpaid = ledger["lift_unpaid"] / 100 * B2_CAPACITY
+    return {
+        "added_kg": ledger["drops"] * 10,
+        "reset_kg": ledger["reset_kg"],
+        "discarded_kg": ledger["discarded_kg"],
+        "expected_mass": ledger["mass"],
+        "b1_in": ledger["drops"] * SMALL_DROP_ENERGY,
+        "b1_spilled": ledger["b1_spilled"] / 100 * B1_CAPACITY,
+        "b2_in": ledger["big_cycles"] * BIG_DROP_ENERGY,
+        "b2_spilled": ledger["b2_spilled"] / 100 * B2_CAPACITY,
+        "lift_paid": ledger["big_cycles"] * BIG_LIFT_COST - lift_unpaid,
+        "lift_unpaid": lift_unpaid,
+    }
+
+
+def audited_step(state, rules, ledger):
+    """
+    Run an audited `engine.step`.
+    Returns (step result, violation message or None).
+    """
+    result = step(state, rules, ledger)
+    if result is None:
+        return result, None
+    return result, ledger["violation"]
+
+
+def audited_run(state, steps, rules):
+    """Audit up to `steps` steps. Returns (steps taken, violation or None, ledger)."""
+    ledger = new_ledger(state)
+    for taken in range(1, steps + 1):
+        result, violation = audited_step(state, rules, ledger)
+        if violation is not None:
+            return taken, violation, ledger
+        if result is None:
+            return taken, None, ledger
+    return steps, None, ledger
+
+
+# ---------- FUZZING ----------
+def random_state(rng, rules=RULES_RESET):
+    """
+    A reachable state: an app start (see `engine.app_start`) advanced by a
+    random number of unaudited `rules` steps, so tied counts, storage and
+    battery levels are ones the engine actually produces. Walks stop early
+    if the seesaw stalls.
+    """
+    state = app_start(rng)
+    for _ in range(rng.randint(0, MAX_WALK)):
+        if step(state, rules) is None:
+            break
+    return state
+
+
+def fuzz(seed, rules, steps, seconds, max_states=None):
+    """
+    Audit random starting states until time or `max_states` runs out.
+    Returns (states checked, steps taken, first failing (state, violation) or None).
+    """
+    rng = random.Random(seed)
+    deadline = time.monotonic() + seconds
+    checked = total_steps = 0
+    while time.monotonic() < deadline and (max_states is None or checked < max_states):
+        for _ in range(1000):
+            initial = random_state(rng, rules)
+            taken, violation, _ = audited_run(dict(initial), steps, rules)
+            checked += 1
+            total_steps += taken
+            if violation is not None:
+                return checked, total_steps, (initial, violation)
+    return checked, total_steps, None
+
+
+def _fuzz_worker(args):
+    return fuzz(*args)
+
+
+def trace(initial, steps, rules):
+    """Replay an audited run from `initial`, returning one line per step."""
+    state = dict(initial)
+    ledger = new_ledger(state)
+    lines = [f"start: {_describe(state)}"]
+    for _ in range(steps):
+        result, violation = audited_step(state, rules, ledger)
+        if result is None:
+            lines.append(f"step {state['step_count']}: no drop")
+        else:
+            action = f"drop {result['side']}, lifted {result['lifted'] * 10}kg, +10kg to {result['added_to']}"
+            if result["big_cycle"] is not None:
+                action += f", big cycle returned {result['big_cycle'][0] * 10}kg to A / {result['big_cycle'][1] * 10}kg to B"
+            lines.append(f"step {state['step_count']}: {action} -> {_describe(state)}")
+        if violation is not None:
+            lines.append(f"VIOLATION: {violation}")
+            break
+        if result is None:
+            break
+    return lines
+
+
+def _describe(state):
+    return (f"A={state['blocks_top_A']} B={state['blocks_top_B']} "
+            f"C={state['tied_bottom_C']} D={state['tied_bottom_D']} "
+            f"storage={state['storage_left']}/{state['storage_right']}kg "
+            f"mass={total_mass(state)}kg B1={state['battery1']:.3f}% B2={state['battery2']:.3f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fuzz the step engine for conservation and invariant violations.")
+    parser.add_argument("--rules", choices=RULES, default=RULES_RESET)
+    parser.add_argument("--steps", type=int, default=20, help="steps audited per starting state")
+    parser.add_argument("--seconds", type=float, default=10, help="time budget per worker")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    jobs = [(args.seed + i, args.rules, args.steps, args.seconds) for i in range(args.workers)]
+    started = time.monotonic()
+    if args.workers > 1:
+        with multiprocessing.Pool(args.workers) as pool:
+            results = pool.map(_fuzz_worker, jobs)
+    else:
+        results = [_fuzz_worker(jobs[0])]
+    elapsed = time.monotonic() - started
+
+    checked = sum(r[0] for r in results)
+    total_steps = sum(r[1] for r in results)
+    print(f"Rules: {args.rules} | States: {checked} | Steps: {total_steps} | "
+          f"{checked / elapsed * 60:,.0f} states/min, {total_steps / elapsed:,.0f} steps/s")
+    failures = [r[2] for r in results if r[2] is not None]
+    if not failures:
+        print("No violations found.")
+        return 0
+    initial, violation = failures[0]
+    print(f"First violation: {violation}")
+    for line in trace(initial, args.steps, args.rules):
+        print(f"  {line}")
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
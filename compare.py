@@ -0,0 +1,187 @@
+"""Side-by-side comparison of the two big-cycle rule sets.
+
+Runs the reset rules (app.py: storage is zeroed) and the return rules
+(appp.py: storage is lifted back to A/B) in lockstep from the same starting
+state, without Streamlit, and reports where they diverge, cumulative B1/B2
+energy and the steps each needed to reach the storage threshold.
+Once either rule set stalls the other keeps running for its tallies, but
+later steps are no longer counted as divergences.
+
+    python compare.py --steps 5000 --a 1 --b 2
+    python compare.py --steps 1000 --random 500 --seed 1
+"""
+import argparse
+import random
+import time
+
+from audit import ledger_totals
+from engine import (RULES, RULES_RESET, STATE_DEFAULTS, app_start, new_ledger, new_state, snapshot, step,
+                    total_mass)
+
+MAX_DIVERGENCES_SHOWN = 10
+
+
+def new_tally():
+    return {"drops": 0, "big_cycles": 0, "threshold_step": None, "stalled_step": None}
+
+
+def _record(tally, state, result):
+    if result is None:
+        if tally["stalled_step"] is None:
+            tally["stalled_step"] = state["step_count"]
+        return
+    tally["drops"] += 1
+    if result["big_cycle"] is not None:
+        tally["big_cycles"] += 1
+        if tally["threshold_step"] is None:
+            tally["threshold_step"] = state["step_count"]
+
+
+def compare(initial, steps):
+    """
+    Step every rule set in `RULES` from a copy of `initial` for `steps` steps.
+    Returns (states, tallies, ledgers, first_state_divergence, divergences):
+    the step at which the states first differed (or None) and
+    (step, {rules: result}) for each step whose outcomes differed, up to and
+    including the step where the first rule set stalled.
+    """
+    states = {rules: dict(initial) for rules in RULES}
+    tallies = {rules: new_tally() for rules in RULES}
+    ledgers = {rules: new_ledger(initial) for rules in RULES}
+    first_state_divergence = None
+    divergences = []
+    for _ in range(steps):
+        either_stalled = any(tally["stalled_step"] is not None for tally in tallies.values())
+        results = {}
+        for rules in RULES:
+            if tallies[rules]["stalled_step"] is None:
+                results[rules] = step(states[rules], rules, ledgers[rules])
+                _record(tallies[rules], states[rules], results[rules])
+            else:
+                results[rules] = None
+        if all(tally["stalled_step"] is not None for tally in tallies.values()):
+            break
+        step_number = max(state["step_count"] for state in states.values())
+        if not either_stalled and len({repr(result) for result in results.values()}) > 1:
+            divergences.append((step_number, results))
+        if first_state_divergence is None and len({snapshot(state) for state in states.values()}) > 1:
+            first_state_divergence = step_number
+    return states, tallies, ledgers, first_state_divergence, divergences
+
+
+def energy(ledger):
+    """
+    Cumulative Joules (B1 generated, B1 stored, B2 generated, B2 stored net
+    of lift costs). Stored excludes what was lost because the battery was full.
+    """
+    totals = ledger_totals(ledger)
+    return (totals["b1_in"], totals["b1_in"] - totals["b1_spilled"],
+            totals["b2_in"], totals["b2_in"] - totals["b2_spilled"] - totals["lift_paid"])
+
+
+def _describe_result(result, rules):
+    if result is None:
+        return "no drop"
+    text = f"drop {result['side']}"
+    if result["big_cycle"] is not None and rules == RULES_RESET:
+        text += ", big cycle reset storage"
+    elif result["big_cycle"] is not None:
+        text += f", big cycle returned {result['big_cycle'][0] * 10}/{result['big_cycle'][1] * 10}kg to A/B"
+    return text
+
+
+def report(initial, steps):
+    started = time.perf_counter()
+    states, tallies, ledgers, first_state_divergence, divergences = compare(initial, steps)
+    elapsed = time.perf_counter() - started
+
+    print(f"Start: A={initial['blocks_top_A']} B={initial['blocks_top_B']} | "
+          f"{steps} steps per rule set in {elapsed * 1000:.1f} ms")
+    print(f"{'':<22}" + "".join(f"{rules:>16}" for rules in RULES))
+    rows = [
+        ("Drops", lambda r: tallies[r]["drops"]),
+        ("Big cycles", lambda r: tallies[r]["big_cycles"]),
+        ("Steps to threshold", lambda r: tallies[r]["threshold_step"] or "-"),
+        ("Stalled at step", lambda r: tallies[r]["stalled_step"] or "-"),
+        ("B1 generated (kJ)", lambda r: f"{energy(ledgers[r])[0] / 1000:,.1f}"),
+        ("B1 stored (kJ)", lambda r: f"{energy(ledgers[r])[1] / 1000:,.1f}"),
+        ("B2 generated (kJ)", lambda r: f"{energy(ledgers[r])[2] / 1000:,.1f}"),
+        ("B2 stored net (kJ)", lambda r: f"{energy(ledgers[r])[3] / 1000:,.1f}"),
+        ("Final B1 / B2 (%)", lambda r: f"{states[r]['battery1']:.1f} / {states[r]['battery2']:.1f}"),
+        ("Final mass (kg)", lambda r: total_mass(states[r])),
+    ]
+    for label, value in rows:
+        print(f"{label:<22}" + "".join(f"{value(rules):>16}" for rules in RULES))
+
+    if first_state_divergence is None:
+        print("No divergence.")
+        return
+    print(f"States first diverged at step {first_state_divergence}.")
+    if not divergences:
+        print("Outcomes never differed before a rule set stalled.")
+        return
+    print(f"Outcomes first differed at step {divergences[0][0]} and on {len(divergences)} steps "
+          f"before a rule set stalled:")
+    for step_number, results in divergences[:MAX_DIVERGENCES_SHOWN]:
+        print(f"  step {step_number}: " + " | ".join(f"{rules}: {_describe_result(results[rules], rules)}" for rules in RULES))
+    if len(divergences) > MAX_DIVERGENCES_SHOWN:
+        print(f"  ... {len(divergences) - MAX_DIVERGENCES_SHOWN} more")
+
+
+def report_random(count, steps, seed):
+    """
+    Compare `count` random app starts (A + B within the block cap, nothing
+    tied or stored) and summarise how the rule sets differ. Starts where
+    neither rule set can drop are counted but tell nothing, so they are
+    left out of the rest of the summary.
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    compared = stuck = diverged = 0
+    first_steps = []
+    totals = {rules: {"steps": 0, "stalled": 0, "b1": 0, "b2": 0} for rules in RULES}
+    for _ in range(count):
+        states, tallies, ledgers, _, divergences = compare(app_start(rng), steps)
+        if all(tally["drops"] == 0 for tally in tallies.values()):
+            stuck += 1
+            continue
+        compared += 1
+        if divergences:
+            diverged += 1
+            first_steps.append(divergences[0][0])
+        for rules in RULES:
+            _, b1, _, b2 = energy(ledgers[rules])
+            totals[rules]["steps"] += states[rules]["step_count"]
+            totals[rules]["stalled"] += tallies[rules]["stalled_step"] is not None
+            totals[rules]["b1"] += b1
+            totals[rules]["b2"] += b2
+    elapsed = time.perf_counter() - started
+
+    print(f"{count} random starts, up to {steps} steps each, in {elapsed:.2f}s; "
+          f"{stuck} could not drop under either rule set")
+    print(f"Outcomes differed on {diverged} of {compared}"
+          + (f", first at step {min(first_steps)} (earliest) / "
+             f"{sorted(first_steps)[len(first_steps) // 2]} (median)" if first_steps else ""))
+    for rules in RULES:
+        total = totals[rules]
+        print(f"  {rules}: {total['steps']:,} steps, stalled in {total['stalled']} of {compared}, "
+              f"B1 stored {total['b1'] / 1000:,.1f} kJ, B2 stored net {total['b2'] / 1000:,.1f} kJ")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the reset (app.py) and return (appp.py) rule sets.")
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--a", type=int, default=STATE_DEFAULTS["blocks_top_A"], help="initial blocks at top A")
+    parser.add_argument("--b", type=int, default=STATE_DEFAULTS["blocks_top_B"], help="initial blocks at top B")
+    parser.add_argument("--random", type=int, default=0, metavar="N", help="compare N random app starts instead")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.random:
+        report_random(args.random, args.steps, args.seed)
+    else:
+        report(new_state(blocks_top_A=args.a, blocks_top_B=args.b), args.steps)
+
+
+if __name__ == "__main__":
+    main()
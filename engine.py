@@ -0,0 +1,362 @@
+"""Headless step engine for the gravity battery seesaw.
+
+The Streamlit apps animate these transitions; everything here works on any
+mapping (a plain dict or ``st.session_state``) and imports neither Streamlit
+nor Plotly, so it can be driven from the command line or other tools.
+
+    python engine.py --steps 1000 --rules return
+"""
+import argparse
+
+# ---------- CONFIG ----------
+GRAVITY = 9.81      # m/s²
+HEIGHT = 100        # m (from +50m to -50m)
+B1_CAPACITY = 100_000  # Joules (100 kJ for Battery 1)
+B2_CAPACITY = 1_000_000  # Joules (1 MJ for Battery 2)
+STORAGE_THRESHOLD = 80  # kg to trigger big cycle
+MAX_TOTAL_BLOCKS = 20  # Max blocks (200kg) at A and B combined
+BIG_LIFT_COST = 80_000  # Joules drawn from B2 to lift the 160kg block back up
+
+SMALL_DROP_ENERGY = 20 * GRAVITY * HEIGHT  # 19,620 J
+BIG_DROP_ENERGY = 160 * GRAVITY * HEIGHT  # 156,960 J
+
+# Big-cycle rule sets: app.py resets storage, appp.py returns it to A/B
+RULES_RESET = "reset"
+RULES_RETURN = "return"
+RULES = (RULES_RESET, RULES_RETURN)
+
+STATE_DEFAULTS = {
+    "blocks_top_A": 1,  # initial 10 kg = 1 block
+    "blocks_top_B": 2,  # initial 20 kg = 2 blocks
+    "tied_bottom_C": 0,
+    "tied_bottom_D": 0,
+    "storage_left": 0,
+    "storage_right": 0,
+    "battery1": 0,  # small battery % (0-100)
+    "battery2": 0,  # big battery % (0-100)
+    "generator_angle": 0,
+    "houses_lit": False,
+    "step_count": 0,
+}
+STATE_KEYS = tuple(STATE_DEFAULTS)
+
+
+def new_state(**overrides):
+    """Return a fresh simulation state dict, optionally overriding fields."""
+    state = dict(STATE_DEFAULTS)
+    for key, value in overrides.items():
+        if key not in STATE_DEFAULTS:
+            raise KeyError(f"Unknown state field: {key}")
+        state[key] = value
+    return state
+
+
+def app_start(rng):
+    """
+    A random state an app can start from: A + B within MAX_TOTAL_BLOCKS,
+    nothing tied or stored, both batteries empty. `rng` is a random.Random.
+    """
+    a = rng.randint(0, MAX_TOTAL_BLOCKS)
+    b = rng.randint(0, MAX_TOTAL_BLOCKS - a)
+    # Only a side with exactly two blocks, facing at most two, can drop, so favour those
+    if rng.random() < 0.5:
+        a, b = 2, rng.randint(0, 2)
+        if rng.random() < 0.5:
+            a, b = b, a
+    return new_state(blocks_top_A=a, blocks_top_B=b, step_count=rng.randint(0, 1))
+
+
+def init_state(state):
+    """Fill in any missing simulation fields on `state` with their defaults."""
+    for key, value in STATE_DEFAULTS.items():
+        if key not in state:
+            state[key] = value
+
+
+def snapshot(state, keys=STATE_KEYS):
+    """Hashable tuple of the simulation fields in `keys`, for change detection."""
+    return tuple(state[key] for key in keys)
+
+
+def storage_total(state):
+    return state["storage_left"] + state["storage_right"]
+
+
+def total_mass(state):
+    """Mass in kg across tops, tied blocks and storage."""
+    return (state["blocks_top_A"] + state["blocks_top_B"] +
+            state["tied_bottom_C"] + state["tied_bottom_D"] +
+            state["storage_left"] // 10 + state["storage_right"] // 10) * 10
+
+
+# ---------- STEP RULES ----------
+def choose_drop(state):
+    """Return the side that drops this step ('left'/'right'), or None."""
+    a, b = state["blocks_top_A"], state["blocks_top_B"]
+    if a == 2 and b < 2:
+        return "left"
+    if b == 2 and a < 2:
+        return "right"
+    if a == 2 and b == 2:
+        # Alternate drops when both sides have 2 blocks
+        return "left" if state["step_count"] % 2 == 0 else "right"
+    return None
+
+
+def apply_drop(state, side):
+    """
+    Drop 20kg from `side`: 10kg goes to storage, 10kg stays tied at the bottom,
+    and the opposite tied block is lifted back to its top. Returns blocks lifted.
+    """
+    if side == "left":
+        lifted = state["tied_bottom_D"]
+        state["blocks_top_A"] = 0
+        state["storage_left"] += 10
+        state["tied_bottom_C"] += 1
+        state["tied_bottom_D"] = 0
+        state["blocks_top_B"] += lifted
+    else:
+        lifted = state["tied_bottom_C"]
+        state["blocks_top_B"] = 0
+        state["storage_right"] += 10
+        state["tied_bottom_D"] += 1
+        state["tied_bottom_C"] = 0
+        state["blocks_top_A"] += lifted
+    return lifted
+
+
+def charge_small_drop(state):
+    """Credit B1 and the generator for a 20kg drop."""
+    state["battery1"] = min(state["battery1"] + (SMALL_DROP_ENERGY / B1_CAPACITY) * 100, 100)
+    state["generator_angle"] += (SMALL_DROP_ENERGY / B1_CAPACITY) * 360  # Proportional rotation
+    state["houses_lit"] = state["battery1"] >= 10
+
+
+def add_to_opposite(state, side):
+    """Add 10kg to the top opposite `side`. Returns the point name ('A'/'B')."""
+    if side == "right":
+        state["blocks_top_A"] += 1
+        return "A"
+    state["blocks_top_B"] += 1
+    return "B"
+
+
+def big_cycle(state, rules=RULES_RESET):
+    """
+    Drop 160kg into B2, empty storage and pay the lift cost from B2.
+    Under RULES_RETURN the stored blocks are lifted back to A/B (clamped to
+    MAX_TOTAL_BLOCKS). Returns (blocks_returned_to_A, blocks_returned_to_B).
+    """
+    state["generator_angle"] += (BIG_DROP_ENERGY / B2_CAPACITY) * 360
+    state["battery2"] = min(state["battery2"] + (BIG_DROP_ENERGY / B2_CAPACITY) * 100, 100)
+    blocks_to_a = blocks_to_b = 0
+    if rules == RULES_RETURN:
+        # Redistribute storage blocks to A and B
+        total_blocks = storage_total(state) // 10
+        blocks_to_a = total_blocks // 2
+        blocks_to_b = total_blocks - blocks_to_a
+        # Ensure we don't exceed MAX_TOTAL_BLOCKS
+        available_slots = MAX_TOTAL_BLOCKS - (state["blocks_top_A"] + state["blocks_top_B"])
+        blocks_to_a = min(blocks_to_a, available_slots)
+        blocks_to_b = min(blocks_to_b, available_slots - blocks_to_a)
+        state["blocks_top_A"] += blocks_to_a
+        state["blocks_top_B"] += blocks_to_b
+    elif rules != RULES_RESET:
+        raise ValueError(f"Unknown rule set: {rules!r}")
+    state["storage_left"] = 0
+    state["storage_right"] = 0
+    state["battery2"] = max(state["battery2"] - (BIG_LIFT_COST / B2_CAPACITY) * 100, 0)
+    state["houses_lit"] = state["battery1"] >= 10
+    return blocks_to_a, blocks_to_b
+
+
+# ---------- AUDIT ----------
+AUDIT_TOLERANCE = 1e-9  # percent points of battery charge
+
+SMALL_DROP_PCT = (SMALL_DROP_ENERGY / B1_CAPACITY) * 100
+BIG_DROP_PCT = (BIG_DROP_ENERGY / B2_CAPACITY) * 100
+BIG_LIFT_PCT = (BIG_LIFT_COST / B2_CAPACITY) * 100
+
+COUNT_KEYS = ("blocks_top_A", "blocks_top_B", "tied_bottom_C", "tied_bottom_D", "storage_left", "storage_right")
+
+
+def new_ledger(state):
+    """
+    Audit counters for a run starting from `state`. Expected mass is carried
+    forward step by step; energy produced is drops * SMALL_DROP_ENERGY and
+    big_cycles * BIG_DROP_ENERGY, so only what was lost is counted.
+    """
+    return {
+        "initial_mass": total_mass(state),
+        "mass": total_mass(state),  # expected total mass after the last audited step
+        "drops": 0,
+        "big_cycles": 0,
+        "reset_kg": 0,  # storage emptied by the reset rules' big cycle
+        "discarded_kg": 0,  # storage the return rules' clamp dropped
+        "b1_spilled": 0.0,  # percent of B1 lost to it being full
+        "b2_spilled": 0.0,  # percent of B2 lost to it being full
+        "lift_unpaid": 0.0,  # percent of lift cost B2 could not cover
+        "violations": 0,
+        "violation": None,  # message for the last step audited by `step`, if it failed
+    }
+
+
+def audit_begin(state):
+    """What `audit_drop` and `audit_big_cycle` need from the state before the change they check."""
+    return state["battery1"], state["battery2"], storage_total(state)
+
+
+def audit_drop(state, ledger, before):
+    """
+    Check a drop applied since `before` (apply_drop, charge_small_drop and
+    add_to_opposite) against `ledger`, updating the counters.
+    Returns a violation message or None.
+    """
+    battery1, _, _ = before
+    ledger["drops"] += 1
+    violation = None
+
+    # Mass: +10kg per drop
+    expected_mass = ledger["mass"] + 10
+    mass = total_mass(state)
+    ledger["mass"] = mass  # carried forward, so one bad step is reported once
+    if mass != expected_mass:
+        violation = f"mass is {mass}kg, ledger expects {expected_mass}kg"
+
+    # Energy: B1 only loses what overflows past 100%
+    spilled = battery1 + SMALL_DROP_PCT - state["battery1"]
+    if spilled > AUDIT_TOLERANCE:
+        if state["battery1"] < 100 - AUDIT_TOLERANCE and violation is None:
+            violation = f"B1 lost {spilled:.6f}% while not full"
+        ledger["b1_spilled"] += spilled
+    elif spilled < -AUDIT_TOLERANCE and violation is None:
+        violation = f"B1 gained {-spilled:.6f}% more than the drop produced"
+
+    # Bounds: a drop only moves B1 and the tops
+    if (not -AUDIT_TOLERANCE <= state["battery1"] <= 100 + AUDIT_TOLERANCE
+            or state["blocks_top_A"] < 0 or state["blocks_top_B"] < 0):
+        violation = violation or check_bounds(state)
+    return _count_violation(ledger, violation)
+
+
+def audit_big_cycle(state, rules, ledger, before, big):
+    """
+    Check a big cycle applied since `before`, where `big` is what
+    `big_cycle` returned, against `ledger`, updating the counters.
+    Returns a violation message or None.
+    """
+    _, battery2, stored_kg = before
+    ledger["big_cycles"] += 1
+    violation = None
+
+    # Mass: storage leaves only where the rules empty it
+    expected_mass = ledger["mass"]
+    if rules == RULES_RESET:
+        ledger["reset_kg"] += stored_kg
+        expected_mass -= stored_kg
+    else:
+        returned_kg = (big[0] + big[1]) * 10
+        if returned_kg != stored_kg:
+            ledger["discarded_kg"] += stored_kg - returned_kg
+            expected_mass -= stored_kg - returned_kg
+            violation = (f"big cycle returned {returned_kg}kg of {stored_kg}kg storage to A/B "
+                         f"({stored_kg - returned_kg}kg discarded by the {MAX_TOTAL_BLOCKS}-block cap)")
+    mass = total_mass(state)
+    ledger["mass"] = mass
+    if mass != expected_mass and violation is None:
+        violation = f"mass is {mass}kg, ledger expects {expected_mass}kg"
+
+    # Energy: B2 gains the big drop, overflows at 100%, then pays the lift
+    charged = battery2 + BIG_DROP_PCT
+    if charged > 100:
+        ledger["b2_spilled"] += charged - 100
+        charged = 100
+    paid = min(BIG_LIFT_PCT, charged)
+    if paid < BIG_LIFT_PCT:
+        ledger["lift_unpaid"] += BIG_LIFT_PCT - paid
+        violation = violation or f"B2 covered only {paid:.3f}% of the {BIG_LIFT_PCT:.3f}% lift cost"
+    elif abs(state["battery2"] - (charged - paid)) > AUDIT_TOLERANCE:
+        violation = violation or f"B2 is {state['battery2']}%, ledger expects {charged - paid}%"
+    return _count_violation(ledger, violation or check_bounds(state))
+
+
+def _count_violation(ledger, violation):
+    if violation is not None:
+        ledger["violations"] += 1
+    return violation
+
+
+def check_bounds(state):
+    """Message for the first battery or block count out of range, or None."""
+    for key in ("battery1", "battery2"):
+        if not -AUDIT_TOLERANCE <= state[key] <= 100 + AUDIT_TOLERANCE:
+            return f"{key} out of bounds: {state[key]}%"
+    for key in COUNT_KEYS:
+        if state[key] < 0:
+            return f"{key} is negative: {state[key]}"
+    return None
+
+
+def step(state, rules=RULES_RESET, ledger=None):
+    """
+    Advance one step without animation, mirroring the apps' step order.
+    Returns None when no drop condition is met, else a dict describing it.
+    With a `ledger` (see `new_ledger`) the step is audited; the outcome is
+    left in ledger["violation"].
+    """
+    state["step_count"] += 1
+    side = choose_drop(state)
+    if side is None:
+        return None
+    before = audit_begin(state) if ledger is not None else None
+    lifted = apply_drop(state, side)
+    charge_small_drop(state)
+    added_to = add_to_opposite(state, side)
+    if ledger is not None:
+        violation = audit_drop(state, ledger, before)
+    result = {"side": side, "lifted": lifted, "added_to": added_to, "big_cycle": None}
+    if storage_total(state) >= STORAGE_THRESHOLD:
+        if ledger is not None:
+            before = audit_begin(state)
+        result["big_cycle"] = big_cycle(state, rules)
+        if ledger is not None:
+            big_violation = audit_big_cycle(state, rules, ledger, before, result["big_cycle"])
+            violation = violation or big_violation
+    if ledger is not None:
+        ledger["violation"] = violation
+    return result
+
+
+def run(state, steps, rules=RULES_RESET):
+    """Run up to `steps` steps, stopping early if the seesaw stalls."""
+    drops = big_cycles = 0
+    for _ in range(steps):
+        result = step(state, rules)
+        if result is None:
+            break
+        drops += 1
+        if result["big_cycle"] is not None:
+            big_cycles += 1
+    return drops, big_cycles
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the seesaw simulation headlessly.")
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--rules", choices=RULES, default=RULES_RESET,
+                        help="big-cycle rules: reset (app.py) or return (appp.py)")
+    parser.add_argument("--a", type=int, default=STATE_DEFAULTS["blocks_top_A"], help="initial blocks at top A")
+    parser.add_argument("--b", type=int, default=STATE_DEFAULTS["blocks_top_B"], help="initial blocks at top B")
+    args = parser.parse_args(argv)
+
+    state = new_state(blocks_top_A=args.a, blocks_top_B=args.b)
+    drops, big_cycles = run(state, args.steps, args.rules)
+    print(f"Steps: {state['step_count']} | Drops: {drops} | Big cycles: {big_cycles}")
+    print(f"Top A: {state['blocks_top_A'] * 10}kg | Top B: {state['blocks_top_B'] * 10}kg | "
+          f"Total mass: {total_mass(state)}kg")
+    print(f"B1: {state['battery1']:.1f}% | B2: {state['battery2']:.1f}% | "
+          f"Gen: {state['generator_angle']:.0f}°")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Indexed event store behind the apps' simulation log.
+
+Events are kept in parallel lists (step, type, text) with a per-type index,
+so filtering by type and step range is a few bisects. With all types (or a
+single type) selected a page is a direct slice; merging several types walks
+the rows in front of the page. The store is a plain dict and keeps the
+full history; `render` draws one page of it with Streamlit, which is only
+imported when a view is actually rendered.
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+EVENT_TYPES = ("state", "drop", "big_cycle", "stop", "error", "info")
+PAGE_SIZE = 50
+
+
+def new_event_log():
+    return {
+        "steps": [],
+        "types": [],
+        "texts": [],
+        "by_type": {kind: [] for kind in EVENT_TYPES},  # type -> indices into the lists above
+        "bytes": 0,
+    }
+
+
+def log_event(log, kind, step, text):
+    """Append an event. Steps must not decrease between calls."""
+    index = len(log["steps"])
+    log["steps"].append(step)
+    log["types"].append(kind)
+    log["texts"].append(text)
+    log["by_type"][kind].append(index)
+    log["bytes"] += len(text.encode())
+
+
+def _ranges(log, kinds, first_step, last_step):
+    """(indices, start, stop) slices of the matching events, one per type."""
+    steps = log["steps"]
+    if set(kinds) >= set(EVENT_TYPES):
+        sources = [range(len(steps))]
+    else:
+        sources = [log["by_type"][kind] for kind in kinds]
+    ranges = []
+    for indices in sources:
+        start = bisect_left(indices, first_step, key=steps.__getitem__)
+        stop = bisect_right(indices, last_step, key=steps.__getitem__)
+        if start < stop:
+            ranges.append((indices, start, stop))
+    return ranges
+
+
+def _reversed_slice(indices, start, stop):
+    for i in range(stop - 1, start - 1, -1):
+        yield indices[i]
+
+
+def count(log, kinds=EVENT_TYPES, first_step=0, last_step=float("inf")):
+    return sum(stop - start for _, start, stop in _ranges(log, kinds, first_step, last_step))
+
+
+def page(log, kinds=EVENT_TYPES, first_step=0, last_step=float("inf"), number=0, page_size=PAGE_SIZE):
+    """
+    Return page `number` (0 = newest) of matching events as
+    [(index, step, type, text), ...], newest first.
+    """
+    ranges = _ranges(log, kinds, first_step, last_step)
+    offset = number * page_size
+    if len(ranges) == 1:
+        indices, start, stop = ranges[0]
+        rows = _reversed_slice(indices, max(stop - offset - page_size, start), stop - offset)
+    else:
+        newest_first = [_reversed_slice(*source) for source in ranges]
+        rows = islice(heapq.merge(*newest_first, reverse=True), offset, offset + page_size)
+    return [(i, log["steps"][i], log["types"][i], log["texts"][i]) for i in rows]
+
+
+def render(log, key="event_log"):
+    """Filter controls plus one page of the log; only that page is sent to the browser."""
+    import streamlit as st
+
+    total = len(log["steps"])
+    st.caption(f"Log: {total} events, {log['bytes'] / 1024:.1f} KB")
+    if not total:
+        return
+    filter_col, range_col, page_col = st.columns([2, 2, 1])
+    with filter_col:
+        kinds = st.multiselect("Event types", EVENT_TYPES, default=EVENT_TYPES, key=f"{key}_types")
+    last_step = log["steps"][-1]
+    with range_col:
+        if last_step > 0:
+            first, last = st.slider("Steps", 0, last_step, (0, last_step), key=f"{key}_steps")
+        else:
+            first, last = 0, 0
+    matches = count(log, kinds, first, last)
+    pages = max((matches + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+    with page_col:
+        number = st.number_input("Page (1 = newest)", min_value=1, max_value=pages, value=1, step=1,
+                                 key=f"{key}_page_{pages}")
+    rows = page(log, kinds, first, last, number - 1)
+    st.caption(f"Showing {len(rows)} of {matches} matching events")
+    st.dataframe(
+        [{"#": i, "Step": step, "Type": kind, "Event": text} for i, step, kind, text in rows],
+        hide_index=True, use_container_width=True, height=300,
+    )
@@ -0,0 +1,314 @@
+"""Concurrent-session load test for the Streamlit apps.
+
+Starts a local `streamlit run` server per app and drives N simulated browser
+sessions over Streamlit's websocket protocol: each session loads the page,
+presses Start, lets the simulation run, presses Stop, and disconnects.
+
+    python loadtest.py --sessions 20 --duration 30 app.py appp.py
+
+Reports per-session rerun latency percentiles, reruns/steps throughput,
+server CPU and memory (total and per session) and the size of each
+session's event log at Stop. One warm-up session runs before the idle
+memory is sampled, so one-time imports (pandas, pyarrow, Streamlit's
+element modules) are not counted against the sessions. Needs the packages
+from requirements.txt (the websocket client comes with Streamlit);
+psutil is used for server metrics when installed, otherwise /proc.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from websockets.asyncio.client import connect as websocket_connect
+
+SERVER_START_TIMEOUT = 30  # seconds to wait for /_stcore/health
+READ_TIMEOUT = 30  # seconds without any message before a session gives up
+SAMPLE_INTERVAL = 0.5  # seconds between server CPU/memory samples
+WARM_UP_DURATION = 3  # seconds the warm-up session runs before the idle sample
+
+
+# ---------- SERVER ----------
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app, port):
+    """Launch `streamlit run app` headlessly and wait until it is healthy."""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", app,
+         "--server.headless", "true",
+         "--server.port", str(port),
+         "--browser.gatherUsageStats", "false"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"streamlit exited with code {proc.returncode} while starting {app}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as resp:
+                if resp.status == 200:
+                    return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"streamlit did not become healthy within {SERVER_START_TIMEOUT}s for {app}")
+
+
+def sample_process(pid):
+    """Return (cpu_seconds, rss_bytes) for `pid`, or (None, None) if unavailable."""
+    if psutil is not None:
+        proc = psutil.Process(pid)
+        cpu = proc.cpu_times()
+        return cpu.user + cpu.system, proc.memory_info().rss
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as f:
+            rss_pages = int(f.read().split()[1])
+    except OSError:
+        return None, None
+    ticks = os.sysconf("SC_CLK_TCK")
+    # utime and stime are fields 14 and 15 of /proc/<pid>/stat (11 and 12 after the comm field)
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / ticks
+    return cpu_seconds, rss_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+async def monitor_server(pid, samples, stop_event, sessions):
+    """Append (time, cpu_seconds, rss_bytes, connected sessions) until `stop_event` is set."""
+    while not stop_event.is_set():
+        samples.append((time.monotonic(),) + sample_process(pid) + (sum(s.connected for s in sessions),))
+        try:
+            await asyncio.wait_for(stop_event.wait(), SAMPLE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+    samples.append((time.monotonic(),) + sample_process(pid) + (sum(s.connected for s in sessions),))
+
+
+# ---------- SESSION ----------
+def rerun_message(triggers=(), bools=None):
+    """BackMsg asking the server to rerun with the given buttons pressed."""
+    msg = BackMsg()
+    msg.rerun_script.query_string = ""
+    msg.rerun_script.page_script_hash = ""
+    for widget_id in triggers:
+        state = msg.rerun_script.widget_states.widgets.add()
+        state.id = widget_id
+        state.trigger_value = True
+    for widget_id, value in (bools or {}).items():
+        state = msg.rerun_script.widget_states.widgets.add()
+        state.id = widget_id
+        state.bool_value = value
+    return msg.SerializeToString()
+
+
+class Session:
+    """One simulated browser tab: tracks widget ids and per-rerun timings."""
+
+    def __init__(self, index):
+        self.index = index
+        self.buttons = {}  # label -> widget id
+        self.checkboxes = {}  # label -> widget id
+        self.run_started = None
+        self.rerun_latencies = []  # seconds from script start to script finish
+        self.last_step = 0
+        self.log_events = 0
+        self.log_kb = 0.0
+        self.connected = False
+        self.error = None
+
+    def handle(self, data):
+        """Update from one ForwardMsg. Returns the script_finished status or None."""
+        msg = ForwardMsg.FromString(data)
+        kind = msg.WhichOneof("type")
+        if kind == "new_session":
+            self.run_started = time.monotonic()
+        elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+            self._handle_element(msg.delta.new_element)
+        elif kind == "script_finished":
+            if self.run_started is not None:
+                self.rerun_latencies.append(time.monotonic() - self.run_started)
+                self.run_started = None
+            return msg.script_finished
+        return None
+
+    def _handle_element(self, element):
+        kind = element.WhichOneof("type")
+        if kind == "button":
+            self.buttons[element.button.label] = element.button.id
+        elif kind == "checkbox":
+            self.checkboxes[element.checkbox.label] = element.checkbox.id
+        elif kind == "markdown" and element.markdown.body.startswith("Step: "):
+            self.last_step = int(element.markdown.body.split(":", 1)[1])
+        elif kind == "markdown" and element.markdown.body.startswith("Log: "):
+            # eventlog.render caption: "Log: <n> events, <size> KB"
+            events, size = element.markdown.body[len("Log: "):].split(", ")
+            self.log_events = int(events.split()[0])
+            self.log_kb = float(size.split()[0])
+
+
+async def read_until_finished(conn, session, statuses):
+    """Read messages until a script_finished with one of `statuses` arrives."""
+    while True:
+        data = await asyncio.wait_for(conn.recv(), READ_TIMEOUT)
+        if isinstance(data, bytes) and session.handle(data) in statuses:
+            return
+
+
+async def drive_session(port, session, duration, hide_scene, start_delay):
+    await asyncio.sleep(start_delay)
+    done = (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_WITH_COMPILE_ERROR)
+    conn = None
+    try:
+        conn = await websocket_connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"],
+                                       max_size=None)
+        session.connected = True
+        # Initial page load
+        await conn.send(rerun_message())
+        await read_until_finished(conn, session, done)
+        bools = {}
+        if hide_scene and "Show scene" in session.checkboxes:
+            bools[session.checkboxes["Show scene"]] = False
+
+        # Press Start and let the simulation rerun on its own
+        await conn.send(rerun_message([session.buttons["Start"]], bools))
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            try:
+                data = await asyncio.wait_for(conn.recv(), deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                break
+            if isinstance(data, bytes):
+                session.handle(data)
+
+        # Press Stop and wait for the final, non-rerunning script run
+        await conn.send(rerun_message([session.buttons["Stop"]], bools))
+        await read_until_finished(conn, session, done)
+    except Exception as e:
+        session.error = f"{type(e).__name__}: {e}"
+    finally:
+        if conn is not None:
+            await conn.close()
+        session.connected = False
+
+
+# ---------- REPORT ----------
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def format_latencies(values):
+    if not values:
+        return "n/a"
+    return " / ".join(f"{percentile(values, pct) * 1000:.0f}" for pct in (50, 90, 99)) + " ms"
+
+
+def rss_slope(samples):
+    """Least-squares slope of RSS bytes against connected sessions, or None."""
+    points = [(connected, rss) for _, _, rss, connected in samples if rss is not None]
+    if len({connected for connected, _ in points}) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    return (sum((x - mean_x) * (y - mean_y) for x, y in points) /
+            sum((x - mean_x) ** 2 for x, _ in points))
+
+
+def report(app, sessions, samples, baseline_rss, elapsed):
+    all_latencies = [lat for s in sessions for lat in s.rerun_latencies]
+    reruns = len(all_latencies)
+    steps = sum(s.last_step for s in sessions)
+    failed = [s for s in sessions if s.error]
+
+    print(f"=== {app}: {len(sessions)} sessions, {elapsed:.1f}s ===")
+    print(f"Rerun latency p50/p90/p99 (all sessions): {format_latencies(all_latencies)}")
+    print(f"Throughput: {reruns / elapsed:.1f} reruns/s, {steps / elapsed:.2f} steps/s")
+    cpu_samples = [(t, cpu) for t, cpu, _, _ in samples if cpu is not None]
+    if len(cpu_samples) >= 2:
+        (t0, c0), (t1, c1) = cpu_samples[0], cpu_samples[-1]
+        print(f"Server CPU: {(c1 - c0) / (t1 - t0) * 100:.0f}% of one core")
+    rss_values = [rss for _, _, rss, _ in samples if rss is not None]
+    if rss_values and baseline_rss is not None:
+        peak = max(rss_values)
+        per_session = (peak - baseline_rss) / max(len(sessions), 1)
+        print(f"Server RSS: {baseline_rss / 2**20:.0f} MB idle after warm-up, {peak / 2**20:.0f} MB peak, "
+              f"~{per_session / 2**10:.0f} KB per session at peak")
+    slope = rss_slope(samples)
+    if slope is not None:
+        print(f"Server RSS slope: ~{slope / 2**10:.0f} KB per connected session")
+    print("Per session: rerun p50/p90/p99 | reruns | steps | event log at Stop")
+    for s in sessions:
+        status = f"  ERROR {s.error}" if s.error else ""
+        print(f"  #{s.index:<3} {format_latencies(s.rerun_latencies):>22} | {len(s.rerun_latencies):>6} | "
+              f"{s.last_step:>5} | {s.log_events} events, {s.log_kb:.1f} KB{status}")
+    if failed:
+        print(f"{len(failed)} of {len(sessions)} sessions failed")
+    print()
+
+
+async def warm_up(port, hide_scene):
+    """Run one short session so the server's one-time imports happen before the idle sample."""
+    session = Session("warm-up")
+    await drive_session(port, session, WARM_UP_DURATION, hide_scene, 0)
+    if session.error:
+        raise RuntimeError(f"warm-up session failed: {session.error}")
+
+
+async def load_test(app, num_sessions, duration, hide_scene, ramp):
+    port = free_port()
+    proc = start_server(app, port)
+    try:
+        await warm_up(port, hide_scene)
+        _, baseline_rss = sample_process(proc.pid)
+        sessions = [Session(i) for i in range(num_sessions)]
+        samples = []
+        stop_event = asyncio.Event()
+        monitor = asyncio.create_task(monitor_server(proc.pid, samples, stop_event, sessions))
+        started = time.monotonic()
+        await asyncio.gather(*(
+            drive_session(port, s, duration, hide_scene, ramp * s.index / max(num_sessions, 1))
+            for s in sessions
+        ))
+        elapsed = time.monotonic() - started
+        stop_event.set()
+        await monitor
+        report(app, sessions, samples, baseline_rss, elapsed)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Streamlit apps with concurrent sessions.")
+    parser.add_argument("apps", nargs="*", default=["app.py", "appp.py"])
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent sessions per app")
+    parser.add_argument("--duration", type=float, default=30, help="seconds between Start and Stop")
+    parser.add_argument("--ramp", type=float, default=0, help="seconds over which sessions connect")
+    parser.add_argument("--hide-scene", action="store_true", help="untick 'Show scene' in every session")
+    args = parser.parse_args(argv)
+
+    for app in args.apps:
+        asyncio.run(load_test(app, args.sessions, args.duration, args.hide_scene, args.ramp))
+
+
+if __name__ == "__main__":
+    main()
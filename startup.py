@@ -0,0 +1,88 @@
+"""Timed imports and cold-start timings for the Streamlit apps.
+
+Under `streamlit run` the server imports Streamlit (and, with current
+Streamlit, Plotly through its chart elements) before the app script ever
+runs, so most of the cold start happens outside the script. This module
+keeps, for the lifetime of the server process:
+
+- how long each module passed to `timed_import` took, or that it was
+  already loaded;
+- how long the process had been running when the first script run began,
+  which covers the server's own imports;
+- how long that first script run took.
+
+psutil is used for the process start time when installed, otherwise /proc.
+"""
+import importlib
+import os
+import sys
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+PRELOADED = None  # recorded instead of a duration for modules already in sys.modules
+
+_import_times = {}  # module name -> seconds spent on its first import, or PRELOADED
+_first_run = {}  # "started": process age in seconds, "seconds": duration of the first script run
+
+
+def process_age():
+    """Seconds since this process started, or None if unavailable."""
+    if psutil is not None:
+        return time.time() - psutil.Process().create_time()
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except OSError:
+        return None
+    # starttime is field 22 of /proc/<pid>/stat (19 after the comm field), in clock ticks since boot
+    return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+
+
+def timed_import(name):
+    """Import `name`, recording how long it took, or PRELOADED if it was already loaded."""
+    module = sys.modules.get(name)
+    if module is not None:
+        _import_times.setdefault(name, PRELOADED)
+        return module
+    t0 = time.perf_counter()
+    module = importlib.import_module(name)
+    _import_times[name] = time.perf_counter() - t0
+    return module
+
+
+def script_started():
+    """Call at the top of the app script. Returns a token for `script_finished`."""
+    if not _first_run:
+        _first_run["started"] = process_age()
+        return time.perf_counter()
+    return None
+
+
+def script_finished(token):
+    """Call before the report is drawn with the token from `script_started`."""
+    if token is not None:
+        _first_run["seconds"] = time.perf_counter() - token
+
+
+def import_report():
+    """Return [(module, seconds or PRELOADED), ...], slowest first and preloaded last."""
+    return sorted(_import_times.items(), key=lambda item: -1 if item[1] is PRELOADED else item[1], reverse=True)
+
+
+def render_report():
+    """Write the cold-start timings with Streamlit."""
+    import streamlit as st
+
+    started = _first_run.get("started")
+    if started is not None:
+        st.write(f"Process start to first script run: {started * 1000:.0f} ms (server imports, including Streamlit)")
+    if "seconds" in _first_run:
+        st.write(f"First script run: {_first_run['seconds'] * 1000:.0f} ms")
+    for name, seconds in import_report():
+        st.write(f"{name}: preloaded" if seconds is PRELOADED else f"{name}: {seconds * 1000:.1f} ms")